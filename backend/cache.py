@@ -0,0 +1,115 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Exact-match cache for LLM responses (in-memory LRU, or Redis when configured)"""
+
+    def __init__(self, max_entries: int = 1024, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            from redis.exceptions import RedisError
+
+            # Short timeouts: an unreachable Redis should cost a cache miss,
+            # not a stalled request
+            self._redis = redis.from_url(
+                redis_url,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+            self._redis_error = RedisError
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss (or Redis error)"""
+        if self._redis is not None:
+            try:
+                return await self._redis.get(key)
+            except self._redis_error as e:
+                logger.warning("LLM cache read failed: %s", e)
+                return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int = 86400) -> None:
+        """Store value under key for ttl seconds (skipped on a Redis error)"""
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, value, ex=ttl)
+            except self._redis_error as e:
+                logger.warning("LLM cache write failed: %s", e)
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        """Release the Redis connection pool, if any"""
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+class SemanticIndex:
+    """Nearest-neighbour lookup from normalized embeddings to exact cache keys
+
+    Entries are kept in separate groups (e.g. one per job description), and a
+    search only considers entries from the same group.
+    """
+
+    def __init__(
+        self, threshold: float = 0.95, max_entries: int = 1024, max_groups: int = 64
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_groups = max_groups
+        self._groups: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+
+    def search(self, group: str, vector: np.ndarray) -> Optional[str]:
+        """Return the key of the closest entry in group if its cosine >= threshold"""
+        entry = self._groups.get(group)
+        if entry is None:
+            return None
+        keys, vectors = entry
+        similarities = vectors @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return keys[best]
+        return None
+
+    def add(self, group: str, key: str, vector: np.ndarray) -> None:
+        """Index vector under key in group, evicting the oldest entries when full"""
+        vector = vector.reshape(1, -1)
+        entry = self._groups.get(group)
+        if entry is None:
+            keys, vectors = [key], vector
+        else:
+            keys, vectors = entry
+            keys.append(key)
+            vectors = np.vstack([vectors, vector])
+            if len(keys) > self.max_entries:
+                keys.pop(0)
+                vectors = vectors[1:]
+
+        self._groups[group] = (keys, vectors)
+        self._groups.move_to_end(group)
+        while len(self._groups) > self.max_groups:
+            self._groups.popitem(last=False)
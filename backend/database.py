@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+import orjson
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    candidate_name TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    analysis TEXT NOT NULL,
+    strengths TEXT NOT NULL,
+    weaknesses TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_score ON candidates (score DESC, id);
+"""
+
+
+class CandidateStore:
+    """Analyzed candidates persisted in SQLite, shared by all server workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+
+    async def open(self) -> None:
+        """Connect, enable WAL and create the schema if needed"""
+        self._db = await aiosqlite.connect(self.path)
+        self._db.row_factory = aiosqlite.Row
+        # WAL lets readers in other workers proceed while one worker writes
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        await self._db.commit()
+
+    async def close(self) -> None:
+        """Close the connection"""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def add(self, candidate: Dict[str, Any]) -> None:
+        """Insert a candidate (strengths and weaknesses are stored as JSON)"""
+        await self._db.execute(
+            "INSERT INTO candidates "
+            "(candidate_name, file_name, score, analysis, strengths, weaknesses) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                candidate["candidate_name"],
+                candidate["file_name"],
+                candidate["score"],
+                candidate["analysis"],
+                orjson.dumps(candidate["strengths"]).decode(),
+                orjson.dumps(candidate["weaknesses"]).decode(),
+            ),
+        )
+        await self._db.commit()
+
+    async def all(self) -> List[Dict[str, Any]]:
+        """Return all candidates, highest score first (ties in insertion order)"""
+        async with self._db.execute(
+            "SELECT candidate_name, file_name, score, analysis, strengths, weaknesses "
+            "FROM candidates ORDER BY score DESC, id"
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+        return [
+            {
+                "candidate_name": row["candidate_name"],
+                "file_name": row["file_name"],
+                "score": row["score"],
+                "analysis": row["analysis"],
+                "strengths": orjson.loads(row["strengths"]),
+                "weaknesses": orjson.loads(row["weaknesses"]),
+            }
+            for row in rows
+        ]
+
+    async def clear(self) -> None:
+        """Delete all candidates"""
+        await self._db.execute("DELETE FROM candidates")
+        await self._db.commit()
@@ -0,0 +1,39 @@
+import os
+import threading
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+EMBEDDING_MODEL = os.environ.get(
+    "EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+)
+
+
+# Serializes the first load, so concurrent first requests don't each load a copy
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the sentence embedding model once per process"""
+    with _model_lock:
+        return _load_embedding_model()
+
+
+@lru_cache(maxsize=1)
+def _load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed texts into L2-normalized vectors (one row per text)"""
+    return get_embedding_model().encode(
+        texts, normalize_embeddings=True, convert_to_numpy=True
+    )
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Embed a single text into an L2-normalized vector"""
+    return embed_texts([text])[0]
@@ -0,0 +1,103 @@
+from typing import Any, List, Optional, Tuple
+
+import orjson
+
+
+class StreamingJSONParser:
+    """Incremental parser that reports top-level object fields as they complete
+
+    Text is consumed in a single pass: only the characters of the key or value
+    currently being read are buffered, so feeding n characters costs O(n)
+    regardless of how the stream is chunked. Anything before the opening
+    brace (prose, code fences) is skipped, and parsing stops at the closing
+    brace of the top-level object.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._done = False
+        self._key: Optional[str] = None
+        self._capturing: Optional[str] = None  # "key", "value" or None
+        self._token: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume chunk and return the (key, value) pairs it completed"""
+        completed: List[Tuple[str, Any]] = []
+        for char in chunk:
+            if self._done:
+                break
+            self._consume(char, completed)
+        return completed
+
+    def _consume(self, char: str, completed: List[Tuple[str, Any]]) -> None:
+        if self._depth == 0:
+            if char == "{":
+                self._depth = 1
+            return
+
+        if self._in_string:
+            if self._capturing:
+                self._token.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._finish_token(completed)
+            return
+
+        if self._depth > 1:
+            self._token.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._finish_token(completed)
+            return
+
+        # Top level of the root object: keys, separators and scalar values
+        if self._capturing == "value" and (char in ",}" or char.isspace()):
+            self._finish_token(completed)
+        if char == "}":
+            self._depth = 0
+            self._done = True
+        elif char == '"':
+            self._in_string = True
+            self._capturing = "key" if self._key is None else "value"
+            self._token = [char]
+        elif char in "{[":
+            if self._key is not None:
+                self._capturing = "value"
+                self._token = [char]
+            self._depth += 1
+        elif char in ",:" or char.isspace():
+            return
+        elif self._key is not None:
+            if self._capturing != "value":
+                self._capturing = "value"
+                self._token = []
+            self._token.append(char)
+
+    def _finish_token(self, completed: List[Tuple[str, Any]]) -> None:
+        text = "".join(self._token)
+        capturing = self._capturing
+        self._capturing = None
+        self._token = []
+        try:
+            value = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            self._key = None
+            return
+
+        if capturing == "key":
+            self._key = value
+        elif capturing == "value":
+            completed.append((self._key, value))
+            self._key = None
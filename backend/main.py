@@ -1,16 +1,55 @@
 import re
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import asyncio
+import gzip
+import hashlib
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from functools import lru_cache
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import fitz
 import docx
 import io
-import requests
+import aiohttp
 import os
 import json
-from typing import List
+import numpy as np
+import orjson
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 from pydantic import BaseModel
+from cache import LLMCache, SemanticIndex
+from database import CandidateStore
+from embeddings import embed_text, embed_texts
+from json_stream import StreamingJSONParser
 
-app = FastAPI(title="CV Selection API")
+# Shared HTTP session for OpenRouter calls (created on startup, closed on shutdown)
+http_session: Optional[aiohttp.ClientSession] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared HTTP session and candidate store, closing them on shutdown"""
+    global http_session
+    http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100, limit_per_host=32, keepalive_timeout=30
+        ),
+        timeout=aiohttp.ClientTimeout(total=120),
+    )
+    await candidate_store.open()
+    if PREFILTER_ENABLED or PROMPT_TOP_PARAGRAPHS or SEMANTIC_CACHE_ENABLED:
+        # Load the embedding model now rather than on the first upload
+        await asyncio.to_thread(embed_text, "")
+    try:
+        yield
+    finally:
+        await http_session.close()
+        http_session = None
+        await llm_cache.close()
+        await candidate_store.close()
+
+
+app = FastAPI(title="CV Selection API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -24,6 +63,39 @@ app.add_middleware(
 # OpenRouter API Configuration
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
 OPENROUTER_ENDPOINT = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_MODEL_FAST = os.environ.get(
+    "OPENROUTER_MODEL_FAST", "meta-llama/llama-3.1-8b-instruct"
+)
+OPENROUTER_MODEL_DEEP = os.environ.get(
+    "OPENROUTER_MODEL_DEEP", "deepseek/deepseek-r1-distill-llama-70b"
+)
+OPENROUTER_MAX_RETRIES = 3
+OPENROUTER_RETRY_BACKOFF = 0.3  # seconds, doubled after every attempt
+OPENROUTER_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Request bodies larger than this many bytes are sent gzip-compressed (0 disables)
+OPENROUTER_GZIP_MIN_BYTES = int(os.environ.get("OPENROUTER_GZIP_MIN_BYTES", "4096"))
+
+# Fields the LLM must return for each analyzed CV
+ANALYSIS_JSON_FIELDS = (
+    '"score": <0-100 match percentage>, "analysis": "<fit for the position>", '
+    '"strengths": ["<relevant strength>", ...], '
+    '"weaknesses": ["<unmet requirement>", ...]'
+)
+
+# LLM response cache: exact match on (models, job, CV), plus an optional
+# semantic tier that reuses results for near-duplicate CVs
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_ENABLED = (
+    os.environ.get("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+)
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+llm_cache = LLMCache(redis_url=os.environ.get("REDIS_URL"))
+semantic_index = SemanticIndex(threshold=SEMANTIC_CACHE_THRESHOLD)
+
+# LLM analyses currently running, by cache key, so concurrent identical
+# requests share one OpenRouter call instead of each missing the cache
+inflight_analyses: Dict[str, asyncio.Future] = {}
 
 
 # Models
@@ -43,16 +115,83 @@ class CandidateResult(BaseModel):
     weaknesses: List[str]
 
 
-# In-memory storage for candidates (in a real app, use a database)
-candidates: List[CandidateResult] = []
+# Text extraction: plain text without whitespace, ligature or image handling,
+# text blocks and DOCX paragraphs separated by blank lines (so prompt
+# compression can tell them apart), pages by form feeds, and a cap on how
+# much CV text is sent to the LLM (anything beyond is almost always noise)
+PDF_TEXT_FLAGS = (
+    fitz.TEXTFLAGS_TEXT
+    & ~fitz.TEXT_PRESERVE_WHITESPACE
+    & ~fitz.TEXT_PRESERVE_LIGATURES
+    & ~fitz.TEXT_PRESERVE_IMAGES
+)
+PDF_PAGE_SEPARATOR = chr(12)
+MAX_CV_CHARS = int(os.environ.get("MAX_CV_CHARS", "30000"))
+
+# Uploads: size limit, read chunk size, and the leading bytes each format
+# must start with (DOCX files are ZIP archives)
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_READ_CHUNK_BYTES = 64 * 1024
+FILE_SIGNATURES = {".pdf": b"%PDF-", ".docx": b"PK\x03\x04"}
+# Batch uploads: maximum number of files and their maximum combined size
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "20"))
+MAX_BATCH_BYTES = int(os.environ.get("MAX_BATCH_BYTES", str(50 * 1024 * 1024)))
+# Largest request body accepted by each upload endpoint, checked against
+# Content-Length before the multipart form is received (the extra megabyte
+# covers the job description and multipart headers)
+FORM_OVERHEAD_BYTES = 1024 * 1024
+UPLOAD_REQUEST_LIMITS = {
+    "/api/analyze-cv/": MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+    "/api/analyze-cv/stream/": MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+    "/api/analyze-cv-batch/": MAX_BATCH_BYTES + FORM_OVERHEAD_BYTES,
+}
+
+# CVs are embedded in chunks that fit the embedding model's input window
+EMBEDDING_CHUNK_CHARS = 1000
+
+# Local pre-filter: CVs whose embedding similarity to the job description is
+# below the threshold get a low score without an LLM call
+PREFILTER_ENABLED = os.environ.get("PREFILTER_ENABLED", "true").lower() == "true"
+PREFILTER_THRESHOLD = float(os.environ.get("PREFILTER_THRESHOLD", "0.25"))
+
+# Model tiers: the fast model handles most CVs, the deep model only those whose
+# local similarity score (0-100) falls in the ambiguous band
+DEEP_MODEL_SCORE_MIN = 40
+DEEP_MODEL_SCORE_MAX = 70
+
+# Prompt compression: send only the CV paragraphs most relevant to the job
+# (0 sends the whole CV)
+PROMPT_TOP_PARAGRAPHS = int(os.environ.get("PROMPT_TOP_PARAGRAPHS", "10"))
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n|\f")
+# Short paragraphs (single bullets, headings) are merged with the following
+# ones up to this size; text without blank lines is split into line windows
+PARAGRAPH_MIN_CHARS = 200
+PARAGRAPH_WINDOW_LINES = 8
+
+# Number of CVs packed into a single OpenRouter call by the batch endpoint
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "8"))
+
+# Precompiled patterns used on every request
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+CANDIDATE_NAME_RE = re.compile(r"\s*(\S[^\n\r\f]*)")
+
+# Candidate storage (SQLite, so results survive restarts and are shared by
+# all uvicorn workers)
+candidate_store = CandidateStore(os.environ.get("CANDIDATES_DB_PATH", "candidates.db"))
 
 
 def extract_text_from_pdf(file_content: bytes) -> str:
     """Extract text from PDF file"""
     try:
-        doc = fitz.open(stream=file_content, filetype="pdf")
-        text = "\n".join([page.get_text() for page in doc])
-        return text
+        with fitz.open(stream=file_content, filetype="pdf") as doc:
+            pages = []
+            for page in doc:
+                # Build the page's text layout once and extract from it directly
+                textpage = page.get_textpage(flags=PDF_TEXT_FLAGS)
+                blocks = (block[4].strip() for block in textpage.extractBLOCKS())
+                pages.append("\n\n".join(block for block in blocks if block))
+                del textpage
+        return PDF_PAGE_SEPARATOR.join(pages)
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error extracting text from PDF: {str(e)}"
@@ -63,7 +202,9 @@ def extract_text_from_docx(file_content: bytes) -> str:
     """Extract text from DOCX file"""
     try:
         doc = docx.Document(io.BytesIO(file_content))
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        text = "\n\n".join(
+            [paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()]
+        )
         return text
     except Exception as e:
         raise HTTPException(
@@ -72,73 +213,539 @@ def extract_text_from_docx(file_content: bytes) -> str:
 
 
 def extract_text_from_file(file_content: bytes, file_extension: str) -> str:
-    """Extract text based on file extension"""
+    """Extract text based on file extension, capped at MAX_CV_CHARS"""
     if file_extension.lower() == ".pdf":
-        return extract_text_from_pdf(file_content)
+        text = extract_text_from_pdf(file_content)
     elif file_extension.lower() == ".docx":
-        return extract_text_from_docx(file_content)
+        text = extract_text_from_docx(file_content)
     else:
         raise HTTPException(
             status_code=400,
             detail="Unsupported file format. Please upload PDF or DOCX files.",
         )
+    return text[:MAX_CV_CHARS]
 
 
-def analyze_cv_with_llm(cv_text: str, job_desc: str) -> CVAnalysisResult:
-    """Analyze CV using OpenRouter API"""
-    if not OPENROUTER_API_KEY:
-        raise HTTPException(status_code=500, detail="OpenRouter API key not configured")
+async def read_upload(file: UploadFile) -> bytes:
+    """Read an uploaded CV, rejecting oversized files and mismatched formats early"""
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    signature = FILE_SIGNATURES.get(file_extension)
+    if signature is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file format. Please upload PDF or DOCX files.",
+        )
+
+    max_megabytes = MAX_UPLOAD_BYTES / (1024 * 1024)
+    too_large = HTTPException(
+        status_code=413, detail=f"File too large. Maximum size is {max_megabytes:g} MB."
+    )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise too_large
+
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > MAX_UPLOAD_BYTES:
+            raise too_large
+
+    if not buffer.startswith(signature):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{file.filename} is not a valid {file_extension[1:].upper()} file.",
+        )
+    return bytes(buffer)
+
+
+def find_json_object(text: str, start: int) -> Optional[str]:
+    """Return the brace-balanced object starting at text[start], if it closes"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+    return None
+
+
+def loads_or_none(text: str) -> Any:
+    """Parse JSON text, returning None if it is not valid JSON"""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def parse_llm_json(content: str) -> dict:
+    """Parse a JSON object from an LLM reply, with or without code fences"""
+    # Well-behaved models (and response_format=json_object) return bare JSON
+    parsed = loads_or_none(content.strip())
+    if isinstance(parsed, dict):
+        return parsed
+
+    # Fenced ```json ... ``` block
+    match = JSON_FENCE_RE.search(content)
+    if match:
+        parsed = loads_or_none(match.group(1))
+        if isinstance(parsed, dict):
+            return parsed
+
+    # First brace-balanced object that parses, skipping any surrounding prose
+    start = content.find("{")
+    while start != -1:
+        candidate = find_json_object(content, start)
+        if candidate is not None:
+            parsed = loads_or_none(candidate)
+            if isinstance(parsed, dict):
+                return parsed
+        start = content.find("{", start + 1)
+
+    raise json.JSONDecodeError("No JSON object found in LLM response", content, 0)
+
+
+def llm_cache_key(cv_text: str, job_desc: str) -> str:
+    """Build the exact-match cache key for a CV analysis"""
+    key_source = orjson.dumps(
+        {
+            "m": [OPENROUTER_MODEL_FAST, OPENROUTER_MODEL_DEEP],
+            "j": job_desc,
+            "c": cv_text,
+        },
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(key_source).hexdigest()
+
+
+async def lookup_cached_analysis(key: str, cv_text: str, job_desc: str):
+    """Return (cached result or None, embedding to index a fresh result under)"""
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return CVAnalysisResult.model_validate_json(cached), None
 
-    prompt = f"""
-    You are an AI assistant helping HR professionals evaluate job candidates.
-    
-    JOB REQUIREMENTS:
-    {job_desc}
-    
-    CANDIDATE CV:
-    {cv_text}
-    
-    Please analyze how well this candidate matches the job requirements. 
-    Provide your response in the following JSON format:
-    {{
-        "score": [a number between 0-100 representing match percentage],
-        "analysis": [a detailed analysis of the candidate's fit for the position],
-        "strengths": [a list of the candidate's key strengths relevant to the position],
-        "weaknesses": [a list of areas where the candidate may not meet requirements]
-    }}
-    
-    Return ONLY the JSON object with no additional text.
+    vector = None
+    if SEMANTIC_CACHE_ENABLED:
+        vector = await asyncio.to_thread(embed_cv, cv_text)
+        similar_key = semantic_index.search(semantic_group(job_desc), vector)
+        if similar_key is not None:
+            cached = await llm_cache.get(similar_key)
+            if cached is not None:
+                return CVAnalysisResult.model_validate_json(cached), None
+
+    return None, vector
+
+
+async def store_cached_analysis(
+    key: str, job_desc: str, vector, result: CVAnalysisResult
+) -> None:
+    """Cache a fresh analysis (and index its embedding for the semantic tier)"""
+    await llm_cache.set(key, result.model_dump_json(), ttl=LLM_CACHE_TTL)
+    if vector is not None:
+        semantic_index.add(semantic_group(job_desc), key, vector)
+
+
+def semantic_group(job_desc: str) -> str:
+    """Semantic index group for a job: CVs are only matched against the same job"""
+    return hashlib.sha256(job_desc.encode()).hexdigest()
+
+
+def cv_chunks(cv_text: str) -> List[str]:
+    """Split a CV into chunks that fit the embedding model's input window"""
+    return [
+        cv_text[i : i + EMBEDDING_CHUNK_CHARS]
+        for i in range(0, len(cv_text), EMBEDDING_CHUNK_CHARS)
+    ]
+
+
+def embed_cv(cv_text: str) -> np.ndarray:
+    """Embed a whole CV as the normalized mean of its chunk embeddings"""
+    chunks = cv_chunks(cv_text) or [""]
+    vector = embed_texts(chunks).mean(axis=0)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+@lru_cache(maxsize=32)
+def embed_job_description(job_desc: str):
+    """Embed a job description (the same one is typically reused across many CVs)"""
+    return embed_text(job_desc)
+
+
+def cv_job_similarity(cv_text: str, job_desc: str) -> float:
+    """Highest cosine similarity between the job description and any CV chunk"""
+    chunks = cv_chunks(cv_text)
+    if not chunks:
+        return 0.0
+    return float((embed_texts(chunks) @ embed_job_description(job_desc)).max())
+
+
+def prefilter_result(similarity: float) -> CVAnalysisResult:
+    """Low-score result for a CV that is clearly unrelated to the job"""
+    return CVAnalysisResult(
+        score=max(0, int(100 * similarity)),
+        analysis=(
+            "Low keyword/semantic overlap with the job requirements, "
+            "so the detailed LLM analysis was skipped."
+        ),
+        strengths=[],
+        weaknesses=["Poor alignment with job requirements"],
+    )
+
+
+def cv_paragraphs(cv_text: str) -> List[str]:
+    """Split a CV into paragraph-sized units for prompt compression"""
+    units = [
+        unit.strip() for unit in PARAGRAPH_SPLIT_RE.split(cv_text) if unit.strip()
+    ]
+    if len(units) == 1:
+        lines = units[0].splitlines()
+        units = [
+            "\n".join(lines[i : i + PARAGRAPH_WINDOW_LINES])
+            for i in range(0, len(lines), PARAGRAPH_WINDOW_LINES)
+        ]
+
+    paragraphs: List[str] = []
+    current: List[str] = []
+    for unit in units:
+        current.append(unit)
+        if sum(len(part) for part in current) >= PARAGRAPH_MIN_CHARS:
+            paragraphs.append("\n".join(current))
+            current = []
+    if current:
+        paragraphs.append("\n".join(current))
+    return paragraphs
+
+
+def compress_cv(cv_text: str, job_desc: str) -> str:
+    """Keep only the CV paragraphs most relevant to the job, in their original order"""
+    paragraphs = cv_paragraphs(cv_text)
+    if len(paragraphs) <= PROMPT_TOP_PARAGRAPHS:
+        return cv_text
+
+    similarities = embed_texts(paragraphs) @ embed_job_description(job_desc)
+    keep = sorted(similarities.argsort()[::-1][:PROMPT_TOP_PARAGRAPHS])
+    return "\n\n".join(paragraphs[i] for i in keep)
+
+
+class PreparedAnalysis(NamedTuple):
+    """Outcome of the local steps that run before an LLM analysis"""
+
+    key: str  # exact-match cache key
+    vector: Any  # embedding to index a fresh result under (semantic cache)
+    result: Optional[CVAnalysisResult]  # cached or pre-filter result, if any
+    prompt_cv_text: str  # CV text to send to the LLM
+    deep: bool  # use the deep model tier instead of the fast one
+
+
+async def prepare_analysis(
+    cv_text: str, job_desc: str, force_llm: bool = False
+) -> PreparedAnalysis:
+    """Check the caches, pre-filter the CV and pick a model tier for it"""
+    key = llm_cache_key(cv_text, job_desc)
+    cached, vector = await lookup_cached_analysis(key, cv_text, job_desc)
+    if cached is not None:
+        return PreparedAnalysis(key, vector, cached, cv_text, False)
+
+    deep = False
+    if PREFILTER_ENABLED:
+        similarity = await asyncio.to_thread(cv_job_similarity, cv_text, job_desc)
+        if similarity < PREFILTER_THRESHOLD and not force_llm:
+            return PreparedAnalysis(
+                key, vector, prefilter_result(similarity), cv_text, False
+            )
+        # Only CVs that are neither clear matches nor clear misses need the
+        # slower, more expensive model
+        deep = DEEP_MODEL_SCORE_MIN <= 100 * similarity <= DEEP_MODEL_SCORE_MAX
+
+    prompt_cv_text = cv_text
+    if PROMPT_TOP_PARAGRAPHS:
+        prompt_cv_text = await asyncio.to_thread(compress_cv, cv_text, job_desc)
+
+    return PreparedAnalysis(key, vector, None, prompt_cv_text, deep)
+
+
+@asynccontextmanager
+async def inflight_analysis(key: str) -> AsyncIterator[asyncio.Future]:
+    """Register the caller as the one running the LLM analysis for a cache key
+
+    The yielded future must be resolved with the result. Concurrent requests
+    for the same key wait for it (see wait_for_inflight) instead of calling
+    the LLM; if the block fails, they receive the same error, and if it is
+    cancelled, one of them runs the analysis instead.
     """
+    future = asyncio.get_running_loop().create_future()
+    inflight_analyses[key] = future
+    try:
+        yield future
+    except BaseException as e:
+        if not future.done():
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # Nobody may be waiting; mark it retrieved
+            else:
+                future.cancel()
+        raise
+    finally:
+        inflight_analyses.pop(key, None)
+        if not future.done():
+            future.cancel()
+
+
+async def wait_for_inflight(key: str) -> Optional[CVAnalysisResult]:
+    """Wait for the analysis another request is running for a cache key
+
+    Returns None if none is running, or if the request running it was
+    cancelled (e.g. its client disconnected); the caller then runs it itself.
+    """
+    while key in inflight_analyses:
+        future = inflight_analyses[key]
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # The caller itself was cancelled
+    return None
+
+
+async def analyze_cv_with_llm(
+    cv_text: str, job_desc: str, force_llm: bool = False
+) -> CVAnalysisResult:
+    """Analyze CV using OpenRouter API, reusing cached results when possible"""
+    prepared = await prepare_analysis(cv_text, job_desc, force_llm)
+    if prepared.result is not None:
+        return prepared.result
+
+    result = await wait_for_inflight(prepared.key)
+    if result is not None:
+        return result
+
+    async with inflight_analysis(prepared.key) as future:
+        result = await request_cv_analysis(
+            prepared.prompt_cv_text, job_desc, deep=prepared.deep
+        )
+        await store_cached_analysis(prepared.key, job_desc, prepared.vector, result)
+        future.set_result(result)
+
+    return result
+
+
+async def analyze_cv_batch_with_llm(
+    cv_texts: List[str], job_desc: str, force_llm: bool = False
+) -> List[CVAnalysisResult]:
+    """Analyze several CVs, packing cache misses into shared OpenRouter calls"""
+    results: List[Optional[CVAnalysisResult]] = [None] * len(cv_texts)
+    # Cache misses per model tier, as (index, prepared analysis) pairs
+    pending = {False: [], True: []}
+    # CVs already being analyzed (elsewhere or earlier in this batch)
+    waiting = []  # (index, cache key)
+
+    async with AsyncExitStack() as stack:
+        futures = {}  # cache key -> future for analyses this batch runs
+        for index, cv_text in enumerate(cv_texts):
+            prepared = await prepare_analysis(cv_text, job_desc, force_llm)
+            if prepared.result is not None:
+                results[index] = prepared.result
+            elif prepared.key in futures or prepared.key in inflight_analyses:
+                waiting.append((index, prepared.key))
+            else:
+                futures[prepared.key] = await stack.enter_async_context(
+                    inflight_analysis(prepared.key)
+                )
+                pending[prepared.deep].append((index, prepared))
+
+        chunks = [
+            (deep, tier_pending[i : i + BATCH_CHUNK_SIZE])
+            for deep, tier_pending in pending.items()
+            for i in range(0, len(tier_pending), BATCH_CHUNK_SIZE)
+        ]
+        chunk_results = await asyncio.gather(
+            *(
+                request_batch_analysis(
+                    [prepared.prompt_cv_text for _, prepared in chunk], job_desc, deep
+                )
+                for deep, chunk in chunks
+            )
+        )
+
+        for (deep, chunk), analyses in zip(chunks, chunk_results):
+            for (index, prepared), result in zip(chunk, analyses):
+                # The model occasionally drops a candidate; analyze it on its own
+                if result is None:
+                    result = await request_cv_analysis(
+                        prepared.prompt_cv_text, job_desc, deep=deep
+                    )
+                await store_cached_analysis(
+                    prepared.key, job_desc, prepared.vector, result
+                )
+                futures[prepared.key].set_result(result)
+                results[index] = result
+
+    for index, key in waiting:
+        if key in futures:
+            result = futures[key].result()
+        else:
+            result = await wait_for_inflight(key)
+        if result is None:
+            # The request analyzing this CV was cancelled; analyze it here
+            result = await analyze_cv_with_llm(cv_texts[index], job_desc, force_llm)
+        results[index] = result
 
-    headers = {
+    return results
+
+
+async def stream_cv_analysis(
+    cv_text: str, job_desc: str, force_llm: bool = False
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (field, value) pairs as the model writes them, then the full result"""
+    prepared = await prepare_analysis(cv_text, job_desc, force_llm)
+    result = prepared.result
+    if result is None:
+        result = await wait_for_inflight(prepared.key)
+    if result is not None:
+        for field, value in result.model_dump().items():
+            yield field, value
+        yield "result", result
+        return
+
+    payload = build_analysis_payload(
+        prepared.prompt_cv_text, job_desc, deep=prepared.deep
+    )
+    payload["stream"] = True
+    parser = StreamingJSONParser()
+    content_parts = []
+
+    async with inflight_analysis(prepared.key) as future:
+        with openrouter_errors():
+            async with post_to_openrouter(payload) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    # Server-sent events: "data: {...}" lines, ": keep-alive" comments
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    chunk = orjson.loads(data)
+                    delta = (
+                        chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                    )
+                    if not delta:
+                        continue
+                    content_parts.append(delta)
+                    for field, value in parser.feed(delta):
+                        if field in CVAnalysisResult.model_fields:
+                            yield field, value
+
+            result = build_analysis_result(parse_llm_json("".join(content_parts)))
+
+        await store_cached_analysis(prepared.key, job_desc, prepared.vector, result)
+        future.set_result(result)
+
+    yield "result", result
+
+
+def openrouter_headers() -> dict:
+    """Build the OpenRouter request headers"""
+    if not OPENROUTER_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenRouter API key not configured")
+
+    return {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
     }
 
-    payload = {
-        "model": "deepseek/deepseek-r1-distill-llama-70b",
+
+@asynccontextmanager
+async def post_to_openrouter(payload: dict) -> AsyncIterator[aiohttp.ClientResponse]:
+    """Send a chat completion request, retrying transient failures with backoff"""
+    body = orjson.dumps(payload)
+    headers = openrouter_headers()
+    if OPENROUTER_GZIP_MIN_BYTES and len(body) > OPENROUTER_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=3)
+        headers["Content-Encoding"] = "gzip"
+
+    for attempt in range(OPENROUTER_MAX_RETRIES + 1):
+        last_attempt = attempt == OPENROUTER_MAX_RETRIES
+        try:
+            response = await http_session.post(
+                OPENROUTER_ENDPOINT, data=body, headers=headers
+            )
+        except aiohttp.ClientConnectionError:
+            if last_attempt:
+                raise
+        else:
+            if last_attempt or response.status not in OPENROUTER_RETRY_STATUSES:
+                try:
+                    yield response
+                finally:
+                    response.release()
+                return
+            response.release()
+
+        await asyncio.sleep(OPENROUTER_RETRY_BACKOFF * 2**attempt)
+
+
+async def request_completion(payload: dict) -> str:
+    """Send a non-streaming chat completion request and return the reply text"""
+    async with post_to_openrouter(payload) as response:
+        response.raise_for_status()
+        result = orjson.loads(await response.read())
+
+    # Extract the content from the response
+    return result.get("choices", [{}])[0].get("message", {}).get("content", "{}")
+
+
+def analysis_model(deep: bool) -> str:
+    """Return the OpenRouter model for the requested tier"""
+    return OPENROUTER_MODEL_DEEP if deep else OPENROUTER_MODEL_FAST
+
+
+def build_analysis_payload(cv_text: str, job_desc: str, deep: bool = False) -> dict:
+    """Build the chat completion payload for a CV analysis"""
+    prompt = (
+        "Rate how well the candidate matches the job requirements.\n\n"
+        f"JOB REQUIREMENTS:\n{job_desc}\n\n"
+        f"CANDIDATE CV:\n{cv_text}\n\n"
+        f"Return ONLY this JSON object: {{{ANALYSIS_JSON_FIELDS}}}"
+    )
+
+    return {
+        "model": analysis_model(deep),
         "messages": [{"role": "user", "content": prompt}],
-        # "response_format": {"type": "json_object"},
+        "response_format": {"type": "json_object"},
     }
 
-    try:
-        response = requests.post(OPENROUTER_ENDPOINT, json=payload, headers=headers)
-        response.raise_for_status()
-        result = response.json()
 
-        # Extract the content from the response
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "{}")
-        match = re.search(r"```json(.*?)```", content, re.DOTALL)
-        # Parse the JSON content
-        analysis_result = json.loads(match.group(1).strip())
+def build_analysis_result(analysis_result: dict) -> CVAnalysisResult:
+    """Convert the parsed LLM JSON into a CVAnalysisResult"""
+    return CVAnalysisResult(
+        score=analysis_result.get("score", 0),
+        analysis=analysis_result.get("analysis", "No analysis provided"),
+        strengths=analysis_result.get("strengths", []),
+        weaknesses=analysis_result.get("weaknesses", []),
+    )
 
-        return CVAnalysisResult(
-            score=analysis_result.get("score", 0),
-            analysis=analysis_result.get("analysis", "No analysis provided"),
-            strengths=analysis_result.get("strengths", []),
-            weaknesses=analysis_result.get("weaknesses", []),
-        )
-    except requests.RequestException as e:
+
+@contextmanager
+def openrouter_errors():
+    """Translate failures while calling OpenRouter into HTTP 500 errors"""
+    try:
+        yield
+    except HTTPException:
+        raise
+    except aiohttp.ClientError as e:
         raise HTTPException(
             status_code=500, detail=f"Error calling OpenRouter API: {str(e)}"
         )
@@ -150,61 +757,274 @@ def analyze_cv_with_llm(cv_text: str, job_desc: str) -> CVAnalysisResult:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+async def request_cv_analysis(
+    cv_text: str, job_desc: str, deep: bool = False
+) -> CVAnalysisResult:
+    """Send a CV analysis request to the OpenRouter API"""
+    payload = build_analysis_payload(cv_text, job_desc, deep)
+
+    with openrouter_errors():
+        content = await request_completion(payload)
+        # Parse the JSON content
+        return build_analysis_result(parse_llm_json(content))
+
+
+def build_batch_payload(cv_texts: List[str], job_desc: str, deep: bool = False) -> dict:
+    """Build one chat completion payload that analyzes several CVs"""
+    cv_sections = "\n\n".join(
+        f"[[{number}]]\n{cv_text}" for number, cv_text in enumerate(cv_texts, start=1)
+    )
+    prompt = (
+        "Rate how well each candidate matches the job requirements.\n\n"
+        f"JOB REQUIREMENTS:\n{job_desc}\n\n"
+        f"CANDIDATES [[1]] to [[{len(cv_texts)}]]:\n{cv_sections}\n\n"
+        "Return ONLY this JSON object, with exactly one result per candidate: "
+        f'{{"results": [{{"id": <candidate number>, {ANALYSIS_JSON_FIELDS}}}, ...]}}'
+    )
+
+    return {
+        "model": analysis_model(deep),
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+    }
+
+
+def batch_result_number(analysis: Any) -> Optional[int]:
+    """CV number of a batch reply entry (models may write it as "2" or 2.0)"""
+    if not isinstance(analysis, dict):
+        return None
+    try:
+        return int(analysis.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_batch_results(content: str) -> list:
+    """Per-CV entries of a batch reply: {"results": [...]} or a bare array"""
+    try:
+        reply, error = parse_llm_json(content), None
+    except json.JSONDecodeError as e:
+        reply, error = {}, e
+    results = reply.get("results")
+    if isinstance(results, list):
+        return results
+
+    # Bare (possibly fenced) array of analyses
+    start, end = content.find("["), content.rfind("]")
+    if start != -1 and end > start:
+        parsed = loads_or_none(content[start : end + 1])
+        if isinstance(parsed, list):
+            return parsed
+
+    if error is not None:
+        raise error
+    return []
+
+
+async def request_batch_analysis(
+    cv_texts: List[str], job_desc: str, deep: bool = False
+) -> List[Optional[CVAnalysisResult]]:
+    """Analyze several CVs in one OpenRouter call (None for any CV the model skipped)"""
+    payload = build_batch_payload(cv_texts, job_desc, deep)
+
+    with openrouter_errors():
+        content = await request_completion(payload)
+        analyses = {}
+        for analysis in parse_batch_results(content):
+            number = batch_result_number(analysis)
+            if number is not None:
+                analyses[number] = analysis
+
+        return [
+            build_analysis_result(analyses[number]) if number in analyses else None
+            for number in range(1, len(cv_texts) + 1)
+        ]
+
+
 def extract_candidate_name(cv_text: str) -> str:
     """Extract candidate name from CV text (simplified version)"""
     # In a real application, use more sophisticated NLP techniques
-    lines = cv_text.split("\n")
     # Simple heuristic: take the first non-empty line as the name
-    for line in lines:
-        if line.strip():
-            return line.strip()
-    return "Unknown Candidate"
+    match = CANDIDATE_NAME_RE.match(cv_text)
+    return match.group(1).strip() if match else "Unknown Candidate"
+
+
+async def store_candidate(
+    cv_text: str, file_name: str, result: CVAnalysisResult
+) -> CandidateResult:
+    """Record an analyzed CV in the candidate store"""
+    candidate_result = CandidateResult(
+        candidate_name=extract_candidate_name(cv_text),
+        file_name=file_name,
+        score=result.score,
+        analysis=result.analysis,
+        strengths=result.strengths,
+        weaknesses=result.weaknesses,
+    )
+
+    await candidate_store.add(candidate_result.model_dump())
+    return candidate_result
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """Encode a server-sent event with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads before their body is received and spooled"""
+    limit = UPLOAD_REQUEST_LIMITS.get(request.url.path)
+    if limit is None or request.method != "POST":
+        return await call_next(request)
+
+    content_length = request.headers.get("content-length")
+    if content_length is None or not content_length.isdigit():
+        return JSONResponse(
+            status_code=411, content={"detail": "Content-Length header required."}
+        )
+    if int(content_length) > limit:
+        max_megabytes = (limit - FORM_OVERHEAD_BYTES) / (1024 * 1024)
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload too large. Maximum is {max_megabytes:g} MB."},
+        )
+    return await call_next(request)
 
 
 @app.post("/api/analyze-cv/", response_model=CVAnalysisResult)
-async def analyze_cv(file: UploadFile = File(...), job_description: str = Form(...)):
-    """Analyze a CV against job requirements"""
+async def analyze_cv(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    force_llm: bool = Form(False),
+):
+    """Analyze a CV against job requirements
+
+    Set force_llm to skip the local pre-filter and always run the LLM analysis.
+    """
     # Get file extension
     file_extension = os.path.splitext(file.filename)[1]
 
     # Read file content
-    file_content = await file.read()
+    file_content = await read_upload(file)
 
     # Extract text from file
-    cv_text = extract_text_from_file(file_content, file_extension)
+    cv_text = await asyncio.to_thread(
+        extract_text_from_file, file_content, file_extension
+    )
 
     # Analyze CV
-    result = analyze_cv_with_llm(cv_text, job_description)
-
-    # Extract candidate name
-    candidate_name = extract_candidate_name(cv_text)
+    result = await analyze_cv_with_llm(cv_text, job_description, force_llm)
 
     # Store candidate result
-    candidate_result = CandidateResult(
-        candidate_name=candidate_name,
-        file_name=file.filename,
-        score=result.score,
-        analysis=result.analysis,
-        strengths=result.strengths,
-        weaknesses=result.weaknesses,
+    await store_candidate(cv_text, file.filename, result)
+
+    return result
+
+
+@app.post("/api/analyze-cv/stream/")
+async def analyze_cv_stream(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    force_llm: bool = Form(False),
+):
+    """Analyze a CV, streaming each result field as a server-sent event
+
+    Emits "score", "analysis", "strengths" and "weaknesses" events as soon as
+    the model has written each field, then a final "result" event with the
+    complete analysis (or an "error" event if the analysis failed).
+    """
+    file_extension = os.path.splitext(file.filename)[1]
+    file_content = await read_upload(file)
+    cv_text = await asyncio.to_thread(
+        extract_text_from_file, file_content, file_extension
     )
+    file_name = file.filename
 
-    candidates.append(candidate_result)
+    async def events():
+        try:
+            async for field, value in stream_cv_analysis(
+                cv_text, job_description, force_llm
+            ):
+                if field == "result":
+                    await store_candidate(cv_text, file_name, value)
+                    value = value.model_dump()
+                yield format_sse(field, value)
+        except HTTPException as e:
+            yield format_sse("error", {"detail": e.detail})
 
-    return result
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/api/analyze-cv-batch/", response_model=List[CandidateResult])
+async def analyze_cv_batch(
+    files: List[UploadFile] = File(...),
+    job_description: str = Form(...),
+    force_llm: bool = Form(False),
+):
+    """Analyze several CVs against the same job requirements"""
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per batch.",
+        )
+
+    max_megabytes = MAX_BATCH_BYTES / (1024 * 1024)
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Batch too large. Maximum total size is {max_megabytes:g} MB.",
+    )
+    if sum(file.size or 0 for file in files) > MAX_BATCH_BYTES:
+        raise too_large
+
+    file_contents = []
+    total_bytes = 0
+    for file in files:
+        file_contents.append(await read_upload(file))
+        total_bytes += len(file_contents[-1])
+        if total_bytes > MAX_BATCH_BYTES:
+            raise too_large
+
+    # Extract text from all files concurrently
+    cv_texts = await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                extract_text_from_file,
+                file_content,
+                os.path.splitext(file.filename)[1],
+            )
+            for file, file_content in zip(files, file_contents)
+        )
+    )
+
+    results = await analyze_cv_batch_with_llm(
+        list(cv_texts), job_description, force_llm
+    )
+
+    return [
+        await store_candidate(cv_text, file.filename, result)
+        for file, cv_text, result in zip(files, cv_texts, results)
+    ]
 
 
 @app.get("/api/candidates/", response_model=List[CandidateResult])
-async def get_candidates():
-    """Get all analyzed candidates sorted by score (highest first)"""
-    sorted_candidates = sorted(candidates, key=lambda x: x.score, reverse=True)
-    return sorted_candidates
+async def get_candidates(request: Request):
+    """Get all analyzed candidates sorted by score (highest first)
+
+    Responses carry an ETag; a request whose If-None-Match matches the current
+    list gets 304 Not Modified without a body.
+    """
+    body = orjson.dumps(await candidate_store.all())
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @app.delete("/api/candidates/")
 async def clear_candidates():
     """Clear all candidates (for testing purposes)"""
-    candidates.clear()
+    await candidate_store.clear()
     return {"message": "All candidates cleared"}
 
 
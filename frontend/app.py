@@ -1,7 +1,10 @@
 import streamlit as st
 import requests
+import sseclient
+import io
 import json
 import os
+from html import escape
 from typing import List, Dict, Any
 
 # API Configuration
@@ -36,6 +39,11 @@ st.markdown("""
         margin-bottom: 20px;
         border-left: 5px solid #1E88E5;
     }
+    .card-header {
+        display: flex;
+        justify-content: space-between;
+        align-items: flex-start;
+    }
     .score-high {
         font-size: 1.5rem;
         color: #2E7D32;
@@ -77,35 +85,33 @@ def get_score_class(score: int) -> str:
     else:
         return "score-low"
 
-def display_candidate_card(candidate: Dict[str, Any]):
-    """Display a candidate card with all information"""
-    with st.container():
-        st.markdown(f'<div class="card">', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns([3, 1])
-        
-        with col1:
-            st.markdown(f"### {candidate['candidate_name']}")
-            st.markdown(f"**File:** {candidate['file_name']}")
-        
-        with col2:
-            st.markdown(
-                f"<div class='{get_score_class(candidate['score'])}'>Score: {candidate['score']}/100</div>", 
-                unsafe_allow_html=True
-            )
-        
-        st.markdown("#### Analysis")
-        st.write(candidate["analysis"])
-        
-        st.markdown("#### Strengths")
-        strengths_html = " ".join([f'<span class="strength">{strength}</span>' for strength in candidate["strengths"]])
-        st.markdown(strengths_html, unsafe_allow_html=True)
-        
-        st.markdown("#### Weaknesses")
-        weaknesses_html = " ".join([f'<span class="weakness">{weakness}</span>' for weakness in candidate["weaknesses"]])
-        st.markdown(weaknesses_html, unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+def render_candidate_card(candidate: Dict[str, Any]) -> str:
+    """Render a candidate card with all information as HTML"""
+    score = candidate["score"]
+    analysis = escape(candidate["analysis"]).replace("\n", "<br>")
+    strengths_html = " ".join([f'<span class="strength">{escape(strength)}</span>' for strength in candidate["strengths"]])
+    weaknesses_html = " ".join([f'<span class="weakness">{escape(weakness)}</span>' for weakness in candidate["weaknesses"]])
+    
+    return (
+        '<div class="card">'
+        '<div class="card-header">'
+        f'<div><h3>{escape(candidate["candidate_name"])}</h3>'
+        f'<p><strong>File:</strong> {escape(candidate["file_name"])}</p></div>'
+        f'<div class="{get_score_class(score)}">Score: {score}/100</div>'
+        '</div>'
+        f'<h4>Analysis</h4><p>{analysis}</p>'
+        f'<h4>Strengths</h4><div>{strengths_html}</div>'
+        f'<h4>Weaknesses</h4><div>{weaknesses_html}</div>'
+        '</div>'
+    )
+
+@st.cache_data(max_entries=8)
+def render_candidates_html(candidates: List[Dict[str, Any]]) -> str:
+    """Render all candidate cards as one HTML string (cached for unchanged lists)"""
+    cards_html = io.StringIO()
+    for candidate in candidates:
+        cards_html.write(render_candidate_card(candidate))
+    return cards_html.getvalue()
 
 def main():
     # Sidebar
@@ -121,14 +127,20 @@ def main():
     
     # CV Upload Section
     st.sidebar.markdown('<div class="section-header">Upload CV</div>', unsafe_allow_html=True)
-    uploaded_file = st.sidebar.file_uploader(
-        "Upload candidate CV",
+    uploaded_files = st.sidebar.file_uploader(
+        "Upload candidate CVs",
         type=["pdf", "docx"],
-        help="Supported formats: PDF, DOCX"
+        accept_multiple_files=True,
+        help="Supported formats: PDF, DOCX. Upload several CVs to analyze them as a batch."
+    )
+    
+    force_llm = st.sidebar.checkbox(
+        "Always run full AI analysis",
+        help="Skip the quick relevance check that scores clearly unrelated CVs without the AI model"
     )
     
     # Process Button
-    process_cv = st.sidebar.button("Analyze CV", type="primary", disabled=not (uploaded_file and job_description))
+    process_cv = st.sidebar.button("Analyze CV", type="primary", disabled=not (uploaded_files and job_description))
     
     # Clear All Button
     if st.sidebar.button("Clear All Candidates"):
@@ -145,23 +157,53 @@ def main():
     st.markdown('<div class="main-header">AI CV Selection System</div>', unsafe_allow_html=True)
     
     # Process the CV if button is clicked
-    if process_cv and uploaded_file and job_description:
+    if process_cv and len(uploaded_files) > 1 and job_description:
+        with st.spinner(f"Analyzing {len(uploaded_files)} CVs... This may take a moment."):
+            try:
+                files = [
+                    ("files", (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type))
+                    for uploaded_file in uploaded_files
+                ]
+                data = {"job_description": job_description, "force_llm": force_llm}
+                
+                response = requests.post(
+                    f"{BACKEND_URL}/api/analyze-cv-batch/",
+                    files=files,
+                    data=data
+                )
+                
+                if response.status_code == 200:
+                    st.success(f"{len(response.json())} CVs analyzed successfully!")
+                else:
+                    st.error(f"Error analyzing CVs: {response.text}")
+            except requests.RequestException as e:
+                st.error(f"Error connecting to backend: {str(e)}")
+    elif process_cv and uploaded_files and job_description:
+        uploaded_file = uploaded_files[0]
         with st.spinner("Analyzing CV... This may take a moment."):
             try:
                 # Prepare the file and data
                 files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-                data = {"job_description": job_description}
+                data = {"job_description": job_description, "force_llm": force_llm}
                 
-                # Send to backend
+                # Send to backend and follow the analysis as it streams in
                 response = requests.post(
-                    f"{BACKEND_URL}/api/analyze-cv/",
+                    f"{BACKEND_URL}/api/analyze-cv/stream/",
                     files=files,
-                    data=data
+                    data=data,
+                    stream=True
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
-                    st.success(f"CV analyzed successfully! Score: {result['score']}/100")
+                    status = st.empty()
+                    for event in sseclient.SSEClient(response).events():
+                        payload = json.loads(event.data)
+                        if event.event == "score":
+                            status.info(f"Score: {payload}/100 - finishing the detailed analysis...")
+                        elif event.event == "result":
+                            status.success(f"CV analyzed successfully! Score: {payload['score']}/100")
+                        elif event.event == "error":
+                            status.error(f"Error analyzing CV: {payload['detail']}")
                 else:
                     st.error(f"Error analyzing CV: {response.text}")
             except requests.RequestException as e:
@@ -169,15 +211,26 @@ def main():
     
     # Display all candidates
     try:
-        response = requests.get(f"{BACKEND_URL}/api/candidates/")
-        if response.status_code == 200:
-            candidates = response.json()
+        # Revalidate this session's copy of the ranking; the backend answers
+        # 304 Not Modified (no body) when it has not changed
+        cached = st.session_state.get("candidates_cache")
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        response = requests.get(f"{BACKEND_URL}/api/candidates/", headers=headers)
+        if response.status_code in (200, 304):
+            if response.status_code == 304:
+                candidates = cached["candidates"]
+            else:
+                candidates = response.json()
+                st.session_state.candidates_cache = {
+                    "etag": response.headers.get("ETag", ""),
+                    "candidates": candidates,
+                }
             
             if candidates:
                 st.markdown('<div class="section-header">Candidates Ranking</div>', unsafe_allow_html=True)
                 
-                for candidate in candidates:
-                    display_candidate_card(candidate)
+                # One message for all cards instead of several per candidate
+                st.markdown(render_candidates_html(candidates), unsafe_allow_html=True)
             else:
                 st.info("No candidates analyzed yet. Upload a CV and job description to get started.")
         else: